@@ -2,78 +2,247 @@ import os
 import tempfile
 import tkinter as tk
 from tkinter import messagebox, ttk
-import shutil
 import subprocess
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-from datetime import datetime
+from watchdog.events import PatternMatchingEventHandler, FileCreatedEvent, FileMovedEvent
+import time
 import argparse
 import logging
 import platform
+import queue
+import re
+import threading
+from collections import OrderedDict
 
 from assemble import assemble
 
-# Set up logging for debugging
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
-
-class DropHandler(FileSystemEventHandler):
-    def __init__(self, file_list, listbox, working_folder):
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # Optional; watchdog's Observer is used instead
+    INotify = None
+
+# Only warnings and errors by default; pass --verbose for debug output
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.mp4', '.mov', '.avi')
+MAX_PROCESSED = 4096
+_PREFIX_RE = re.compile(r'^(?:#\d+#)+')
+_SYSTEM = platform.system()
+_OPEN_CMD = {"Darwin": ["open"]}.get(_SYSTEM, ["xdg-open"])  # Linux and others use xdg-open
+
+def _fast_rmtree(path):
+    """Delete a directory tree without shutil.rmtree's per-entry stat calls."""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                _fast_rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+    os.rmdir(path)
+
+RESOLUTIONS = ("720p", "1080p", "4k")
+
+# (label, defaults key, Tk variable type) for each form row
+FORM_FIELDS = (
+    ("Output File:", 'output_file', tk.StringVar),
+    ("Image Duration (s):", 'image_duration', tk.DoubleVar),
+    ("Max Video Duration (s):", 'max_video_duration', tk.DoubleVar),
+    ("Blur Radius:", 'blur_radius', tk.DoubleVar),
+    ("Zoom Start:", 'zoom_start', tk.DoubleVar),
+    ("Zoom End:", 'zoom_end', tk.DoubleVar),
+    ("Overlay Scale (0-1):", 'overlay_scale', tk.DoubleVar),
+    ("Transition Duration (s):", 'transition_duration', tk.DoubleVar),
+    ("Text Fade-In (s):", 'text_fade_in', tk.DoubleVar),
+    ("Text Fade-Out (s):", 'text_fade_out', tk.DoubleVar),
+    ("Background Opacity (0-1):", 'background_opacity', tk.DoubleVar),
+    ("Threads:", 'threads', tk.IntVar),
+    ("Draw Text:", 'draw_text', tk.BooleanVar),
+)
+
+class InotifyObserver(threading.Thread):
+    """Linux-only stand-in for watchdog's Observer that drains inotify events in batches.
+
+    Supports the subset of the Observer API the app uses (schedule, unschedule_all,
+    start, stop) and dispatches watchdog event objects so handlers work unchanged.
+    """
+    def __init__(self, timeout=200):
+        super().__init__(daemon=True)
+        self._inotify = INotify()
+        self._watches = {}  # wd -> (event_handler, watched folder)
+        self._timeout = timeout
+        self._stopped = threading.Event()
+
+    def schedule(self, event_handler, path, recursive=False):
+        wd = self._inotify.add_watch(path, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+        self._watches[wd] = (event_handler, path)
+
+    def unschedule_all(self):
+        for wd in list(self._watches):
+            del self._watches[wd]
+            try:
+                self._inotify.rm_watch(wd)
+            except OSError:
+                pass  # Folder already gone
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                # One read() returns every event queued since the last one
+                for event in self._inotify.read(timeout=self._timeout):
+                    watch = self._watches.get(event.wd)
+                    if watch is None or not event.name or event.mask & inotify_flags.ISDIR:
+                        continue
+                    event_handler, folder = watch
+                    file_path = os.path.join(folder, event.name)
+                    if event.mask & inotify_flags.MOVED_TO:
+                        event_handler.dispatch(FileMovedEvent(file_path, file_path))
+                    else:
+                        event_handler.dispatch(FileCreatedEvent(file_path))
+        finally:
+            self._inotify.close()
+
+class DropHandler(PatternMatchingEventHandler):
+    def __init__(self, root, file_list, listbox, working_folder):
+        super().__init__(
+            patterns=[f"*{ext}" for ext in VALID_EXTENSIONS],
+            ignore_directories=True,
+            case_sensitive=False
+        )
+        self.root = root
         self.file_list = file_list
         self.listbox = listbox
         self.working_folder = working_folder
-        self.valid_extensions = ('.jpg', '.jpeg', '.png', '.mp4', '.mov', '.avi')
         self.insertion_counter = 0
-        self.processed_files = set()  # Track processed files to avoid re-renaming
+        self.processed_files = OrderedDict()  # Basenames already handled, oldest first
+        self._registered = set()  # Paths in file_list, so repeat events are dropped in O(1)
+        self._pending = False  # A coalesced listbox flush is already scheduled
+        self._last_len = 0  # Number of file_list rows already shown in the listbox
+        self._ts_cache = (0, "")  # (epoch second, formatted timestamp) for the last event
 
     def on_created(self, event):
-        if not event.is_directory:
-            file_path = event.src_path
-            logging.debug(f"Detected file creation: {file_path}")
-            if file_path.lower().endswith(self.valid_extensions) and file_path not in self.processed_files:
-                new_file_path = self.rename_file(file_path)
-                if new_file_path:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self.file_list.append((new_file_path, timestamp))
-                    self.processed_files.add(new_file_path)  # Mark as processed
-                    self.update_listbox()
-            else:
-                logging.debug(f"Ignored file (invalid extension or already processed): {file_path}")
+        file_path = event.src_path
+        logging.debug("Detected file creation: %s", file_path)
+        if os.path.basename(file_path) not in self.processed_files:
+            self.register_file(file_path)
+        else:
+            logging.debug("Ignored file (already processed): %s", file_path)
 
     def on_moved(self, event):
-        if not event.is_directory:
-            file_path = event.dest_path
-            logging.debug(f"Detected file move: {file_path}")
-            if file_path.lower().endswith(self.valid_extensions) and file_path not in self.processed_files:
-                new_file_path = self.rename_file(file_path)
-                if new_file_path:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self.file_list.append((new_file_path, timestamp))
-                    self.processed_files.add(new_file_path)  # Mark as processed
-                    self.update_listbox()
-            else:
-                logging.debug(f"Ignored moved file (invalid extension or already processed): {file_path}")
-
-    def rename_file(self, file_path):
+        # Dispatched when either side matches the patterns, so check the destination too
+        file_path = event.dest_path
+        logging.debug("Detected file move: %s", file_path)
+        if os.path.basename(file_path) in self.processed_files:
+            logging.debug("Ignored moved file (already processed): %s", file_path)
+            return
+        if os.path.splitext(file_path)[1].lower() not in VALID_EXTENSIONS:
+            file_path = None  # Renamed to an unsupported type; only the old entry goes
+        self.root.after(0, self._move_entry, event.src_path, file_path)
+
+    def register_file(self, file_path):
+        """Record a dropped file; renaming is deferred until the folder is processed."""
+        self.insertion_counter += 1
+        # Only renamed files are marked processed: a later drop may reuse this basename
+        # once the file has been renamed. Repeat events are dropped in _enqueue.
+        # Watchdog runs on its own thread; hand the row over to the Tk thread
+        self.root.after(0, self._enqueue, file_path, self._timestamp(), self.insertion_counter)
+
+    def _mark_processed(self, *file_paths):
+        """Remember basenames so the rename's own events are ignored; bounded to MAX_PROCESSED."""
+        for file_path in file_paths:
+            self.processed_files[os.path.basename(file_path)] = None
+        while len(self.processed_files) > MAX_PROCESSED:
+            self.processed_files.popitem(last=False)
+
+    def _timestamp(self):
+        """Return the current local time, formatting it at most once per second."""
+        s = int(time.time())
+        if s != self._ts_cache[0]:
+            self._ts_cache = (s, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s)))
+        return self._ts_cache[1]
+
+    def rename_file(self, file_path, counter):
         try:
-            self.insertion_counter += 1
             file_name = os.path.basename(file_path)
-            # Strip any existing #<number> prefixes to avoid stacking
-            clean_file_name = file_name
-            while clean_file_name.startswith('#') and clean_file_name[1].isdigit():
-                clean_file_name = clean_file_name[2:]  # Remove #<number>
-            new_file_name = f"#{self.insertion_counter}#{clean_file_name}"
+            # Strip any existing #<number># prefixes to avoid stacking
+            clean_file_name = _PREFIX_RE.sub('', file_name)
+            new_file_name = f"#{counter}#{clean_file_name}"
+            if new_file_name == file_name:
+                return file_path
             new_file_path = os.path.join(self.working_folder, new_file_name)
             os.rename(file_path, new_file_path)
-            logging.debug(f"Renamed file: {file_path} to {new_file_path}")
+            # Marked only once renamed, so a failed rename never blocks the name
+            self._mark_processed(new_file_path)
+            logging.debug("Renamed file: %s to %s", file_path, new_file_path)
             return new_file_path
         except Exception as e:
-            logging.error(f"Failed to rename file {file_path}: {e}")
+            logging.error("Failed to rename file %s: %s", file_path, e)
             return None
 
-    def update_listbox(self):
-        self.listbox.delete(0, tk.END)
-        for file_path, ts in self.file_list:
-            self.listbox.insert(tk.END, f"{ts}: {os.path.basename(file_path)}")
+    def apply_insertion_order(self):
+        """Prefix every dropped file with #<counter># so the folder sorts in drop order.
+
+        Files deleted from the folder since they were dropped, or that fail to rename,
+        are removed from the list so they are not handed to assemble().
+        """
+        kept = []
+        for file_path, timestamp, counter, basename in self.file_list:
+            new_file_path = self.rename_file(file_path, counter) if os.path.exists(file_path) else None
+            if new_file_path is None:
+                logging.warning("Removed missing or unrenamable file from the list: %s", file_path)
+                self._registered.discard(file_path)
+            elif new_file_path != file_path:
+                kept.append((new_file_path, timestamp, counter, os.path.basename(new_file_path)))
+                self._registered.discard(file_path)
+                self._registered.add(new_file_path)
+            else:
+                kept.append((file_path, timestamp, counter, basename))
+        if kept != self.file_list:
+            self.file_list[:] = kept  # Shared with DragDropApp, so update in place
+            self.update_listbox(resync=True)
+
+    def _enqueue(self, file_path, timestamp, counter):
+        """Record a new file and schedule a coalesced listbox update (Tk thread only)."""
+        if file_path in self._registered:
+            logging.debug("Ignored file (already registered): %s", file_path)
+            return
+        self._registered.add(file_path)
+        self.file_list.append((file_path, timestamp, counter, os.path.basename(file_path)))
+        if not self._pending:
+            self._pending = True
+            self.root.after(50, self._flush)
+
+    def _move_entry(self, src_path, dest_path):
+        """Point src_path's row at dest_path, dropping it if dest_path is None (Tk thread only)."""
+        if src_path not in self._registered:
+            if dest_path:
+                self.register_file(dest_path)  # Moved in from elsewhere
+            return
+        self._registered.discard(src_path)
+        i = next(i for i, entry in enumerate(self.file_list) if entry[0] == src_path)
+        if dest_path is None or dest_path in self._registered:
+            del self.file_list[i]
+        else:
+            _, timestamp, counter, _ = self.file_list[i]
+            self.file_list[i] = (dest_path, timestamp, counter, os.path.basename(dest_path))
+            self._registered.add(dest_path)
+        self.update_listbox(resync=True)
+
+    def _flush(self):
+        self._pending = False
+        self.update_listbox()
+
+    def update_listbox(self, resync=False):
+        """Append rows added since the last refresh in one Tk call; resync rebuilds the list."""
+        if resync:
+            self.listbox.delete(0, tk.END)
+            self._last_len = 0
+        rows = [f"{ts}: {basename}" for _, ts, _, basename in self.file_list[self._last_len:]]
+        if rows:
+            self.listbox.insert(tk.END, *rows)
+        self._last_len = len(self.file_list)
 
 class DragDropApp:
     def __init__(self, root):
@@ -83,8 +252,10 @@ class DragDropApp:
 
         # Create temporary working folder
         self.working_folder = tempfile.mkdtemp(prefix="media_drop_")
-        self.file_list = []
-        logging.info(f"Temporary folder created: {self.working_folder}")
+        self.file_list = []  # (path, timestamp, insertion counter, basename) per dropped file
+        # Probe results survive between presses of Process Folder; deleted with the folder
+        self._extract_cache_dir = os.path.join(self.working_folder, ".cache")
+        logging.info("Temporary folder created: %s", self.working_folder)
 
         # GUI Elements
         self.label = tk.Label(root, text=f"Working Folder: {self.working_folder}")
@@ -104,7 +275,7 @@ class DragDropApp:
         self.defaults = {
             'input_dir': "queen 14",
             'output_file': "iku_2.mp4",
-            'resolution': "1080p",
+            'resolutions': ["1080p"],
             'image_duration': 11.0,
             'max_video_duration': 11.0,
             'blur_radius': 15.0,
@@ -115,81 +286,53 @@ class DragDropApp:
             'text_fade_in': 4,
             'text_fade_out': 2,
             'background_opacity': 0.8,
-            'threads': 2,
+            'threads': os.cpu_count() or 4,
             'draw_text': True
         }
 
-        # Form fields
-        ttk.Label(self.form_frame, text="Output File:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
-        self.output_file_var = tk.StringVar(value=self.defaults['output_file'])
-        ttk.Entry(self.form_frame, textvariable=self.output_file_var).grid(row=0, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Resolution:").grid(row=1, column=0, sticky="w", padx=5, pady=2)
-        self.resolution_var = tk.StringVar(value=self.defaults['resolution'])
-        ttk.Combobox(self.form_frame, textvariable=self.resolution_var, values=["720p", "1080p", "4k"]).grid(row=1, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Image Duration (s):").grid(row=2, column=0, sticky="w", padx=5, pady=2)
-        self.image_duration_var = tk.DoubleVar(value=self.defaults['image_duration'])
-        ttk.Entry(self.form_frame, textvariable=self.image_duration_var).grid(row=2, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Max Video Duration (s):").grid(row=3, column=0, sticky="w", padx=5, pady=2)
-        self.max_video_duration_var = tk.DoubleVar(value=self.defaults['max_video_duration'])
-        ttk.Entry(self.form_frame, textvariable=self.max_video_duration_var).grid(row=3, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Blur Radius:").grid(row=4, column=0, sticky="w", padx=5, pady=2)
-        self.blur_radius_var = tk.DoubleVar(value=self.defaults['blur_radius'])
-        ttk.Entry(self.form_frame, textvariable=self.blur_radius_var).grid(row=4, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Zoom Start:").grid(row=5, column=0, sticky="w", padx=5, pady=2)
-        self.zoom_start_var = tk.DoubleVar(value=self.defaults['zoom_start'])
-        ttk.Entry(self.form_frame, textvariable=self.zoom_start_var).grid(row=5, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Zoom End:").grid(row=6, column=0, sticky="w", padx=5, pady=2)
-        self.zoom_end_var = tk.DoubleVar(value=self.defaults['zoom_end'])
-        ttk.Entry(self.form_frame, textvariable=self.zoom_end_var).grid(row=6, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Overlay Scale (0-1):").grid(row=7, column=0, sticky="w", padx=5, pady=2)
-        self.overlay_scale_var = tk.DoubleVar(value=self.defaults['overlay_scale'])
-        ttk.Entry(self.form_frame, textvariable=self.overlay_scale_var).grid(row=7, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Transition Duration (s):").grid(row=8, column=0, sticky="w", padx=5, pady=2)
-        self.transition_duration_var = tk.DoubleVar(value=self.defaults['transition_duration'])
-        ttk.Entry(self.form_frame, textvariable=self.transition_duration_var).grid(row=8, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Text Fade-In (s):").grid(row=9, column=0, sticky="w", padx=5, pady=2)
-        self.text_fade_in_var = tk.DoubleVar(value=self.defaults['text_fade_in'])
-        ttk.Entry(self.form_frame, textvariable=self.text_fade_in_var).grid(row=9, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Text Fade-Out (s):").grid(row=10, column=0, sticky="w", padx=5, pady=2)
-        self.text_fade_out_var = tk.DoubleVar(value=self.defaults['text_fade_out'])
-        ttk.Entry(self.form_frame, textvariable=self.text_fade_out_var).grid(row=10, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Background Opacity (0-1):").grid(row=11, column=0, sticky="w", padx=5, pady=2)
-        self.background_opacity_var = tk.DoubleVar(value=self.defaults['background_opacity'])
-        ttk.Entry(self.form_frame, textvariable=self.background_opacity_var).grid(row=11, column=1, sticky="ew", padx=5, pady=2)
-
-        ttk.Label(self.form_frame, text="Threads:").grid(row=12, column=0, sticky="w", padx=5, pady=2)
-        self.threads_var = tk.IntVar(value=self.defaults['threads'])
-        ttk.Entry(self.form_frame, textvariable=self.threads_var).grid(row=12, column=1, sticky="ew", padx=5, pady=2)
+        # Form fields, built from FORM_FIELDS
+        self.vars = {}
+        for row, (label, name, var_type) in enumerate(FORM_FIELDS):
+            ttk.Label(self.form_frame, text=label).grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            var = self.vars[name] = var_type(value=self.defaults[name])
+            if var_type is tk.BooleanVar:
+                ttk.Checkbutton(self.form_frame, variable=var).grid(row=row, column=1, sticky="w", padx=5, pady=2)
+            else:
+                ttk.Entry(self.form_frame, textvariable=var).grid(row=row, column=1, sticky="ew", padx=5, pady=2)
 
-        ttk.Label(self.form_frame, text="Draw Text:").grid(row=13, column=0, sticky="w", padx=5, pady=2)
-        self.draw_text_var = tk.BooleanVar(value=self.defaults['draw_text'])
-        ttk.Checkbutton(self.form_frame, variable=self.draw_text_var).grid(row=13, column=1, sticky="w", padx=5, pady=2)
+        # Several renditions can be selected; assemble() derives each from the next larger one
+        row = len(FORM_FIELDS)
+        ttk.Label(self.form_frame, text="Resolutions:").grid(row=row, column=0, sticky="nw", padx=5, pady=2)
+        self.resolutions_listbox = tk.Listbox(self.form_frame, selectmode=tk.MULTIPLE, height=len(RESOLUTIONS), exportselection=False)
+        self.resolutions_listbox.insert(tk.END, *RESOLUTIONS)
+        for resolution in self.defaults['resolutions']:
+            self.resolutions_listbox.selection_set(RESOLUTIONS.index(resolution))
+        self.resolutions_listbox.grid(row=row, column=1, sticky="ew", padx=5, pady=2)
 
         self.form_frame.columnconfigure(1, weight=1)
 
         self.process_button = tk.Button(root, text="Process Folder", command=self.process_folder)
         self.process_button.pack(pady=10)
 
+        self.progress = ttk.Progressbar(root, mode="indeterminate", length=300)
+        self.progress.pack(pady=5)
+        self._result_q = queue.Queue()
+
         # Set up file system watcher
-        self.event_handler = DropHandler(self.file_list, self.listbox, self.working_folder)
-        self.observer = Observer()
+        self._watching = False
+        self.event_handler = DropHandler(self.root, self.file_list, self.listbox, self.working_folder)
+        if _SYSTEM == "Linux" and INotify is not None:
+            self.observer = InotifyObserver()
+        else:
+            self.observer = Observer()
+            self.observer.daemon = True  # Never keep the process alive after the window closes
         try:
             self.observer.schedule(self.event_handler, self.working_folder, recursive=False)
             self.observer.start()
+            self._watching = True
             logging.info("File system observer started")
         except Exception as e:
-            logging.error(f"Failed to start observer: {e}")
+            logging.error("Failed to start observer: %s", e)
             messagebox.showerror("Error", f"Failed to monitor folder: {e}")
 
         # Clean up on window close
@@ -198,62 +341,119 @@ class DragDropApp:
     def open_working_folder(self):
         """Open the temporary working folder in the system's file explorer."""
         try:
-            if platform.system() == "Windows":
+            if _SYSTEM == "Windows":
                 os.startfile(self.working_folder)
-            elif platform.system() == "Darwin":  # macOS
-                subprocess.run(["open", self.working_folder], check=True)
-            else:  # Linux and others
-                subprocess.run(["xdg-open", self.working_folder], check=True)
-            logging.info(f"Opened working folder: {self.working_folder}")
+            else:  # Don't wait for the file manager to come up
+                subprocess.Popen(_OPEN_CMD + [self.working_folder])
+            logging.info("Opened working folder: %s", self.working_folder)
         except Exception as e:
-            logging.error(f"Failed to open folder: {e}")
+            logging.error("Failed to open folder: %s", e)
             messagebox.showerror("Error", f"Failed to open folder: {e}")
 
     def process_folder(self):
         try:
+            self._pause_watcher()
+            self.event_handler.apply_insertion_order()
             if not self.file_list:
                 raise ValueError("No files have been dropped into the working folder")
             # Create argparse Namespace with UI values
-            args = argparse.Namespace(
-                input_dir=self.working_folder,
-                output_file=self.output_file_var.get(),
-                resolution=self.resolution_var.get(),
-                width=None,
-                height=None,
-                image_duration=self.image_duration_var.get(),
-                max_video_duration=self.max_video_duration_var.get(),
-                blur_radius=self.blur_radius_var.get(),
-                zoom_start=self.zoom_start_var.get(),
-                zoom_end=self.zoom_end_var.get(),
-                overlay_scale=self.overlay_scale_var.get(),
-                transition_duration=self.transition_duration_var.get(),
-                text_fade_in=self.text_fade_in_var.get(),
-                text_fade_out=self.text_fade_out_var.get(),
-                background_opacity=self.background_opacity_var.get(),
-                threads=self.threads_var.get(),
-                draw_text=self.draw_text_var.get()
-            )
-            result = assemble(args)
-            messagebox.showinfo("Success", result)
+            kwargs = {name: var.get() for name, var in self.vars.items()}
+            resolutions = [self.resolutions_listbox.get(i) for i in self.resolutions_listbox.curselection()]
+            if not resolutions:
+                raise ValueError("Select at least one resolution")
+            kwargs.update(input_dir=self.working_folder, width=None, height=None,
+                          resolution=None, resolutions=resolutions, hwaccel='none', ffmpeg_threads=0,
+                          extract_cache_dir=self._extract_cache_dir, tmp_dir=None,
+                          files=[entry[0] for entry in sorted(self.file_list, key=lambda entry: entry[2])])
+            args = argparse.Namespace(**kwargs)
         except Exception as e:
-            logging.error(f"Processing failed: {e}")
+            logging.error("Processing failed: %s", e)
             messagebox.showerror("Error", f"Processing failed: {str(e)}")
+            self._resume_watcher()
+            return
+
+        # Run ffmpeg off the Tk thread so the window keeps redrawing
+        self.process_button.config(state=tk.DISABLED)
+        self.progress.start(10)
+        threading.Thread(target=self._run_assemble, args=(args,), daemon=True).start()
+        self.root.after(100, self._poll_result)
+
+    def _pause_watcher(self):
+        """Stop watching while renaming and encoding so our own writes raise no events."""
+        if self._watching:
+            self.observer.unschedule_all()
+            self._watching = False
+            logging.info("File system observer paused for processing")
+
+    def _resume_watcher(self):
+        if not self._watching:
+            try:
+                self.observer.schedule(self.event_handler, self.working_folder, recursive=False)
+                self._watching = True
+                logging.info("File system observer resumed")
+            except Exception as e:
+                logging.error("Failed to resume observer: %s", e)
+            self._register_missed_files()
+
+    def _register_missed_files(self):
+        """Register files dropped while the watcher was paused, oldest first."""
+        known = {entry[3] for entry in self.file_list}
+        try:
+            with os.scandir(self.working_folder) as it:
+                missed = [entry for entry in it if entry.name not in known and entry.is_file()
+                          and entry.name.lower().endswith(VALID_EXTENSIONS)]
+            missed.sort(key=lambda entry: entry.stat().st_mtime)
+        except OSError as e:
+            logging.error("Failed to scan working folder: %s", e)
+            return
+        for entry in missed:
+            logging.debug("Registering file dropped while paused: %s", entry.path)
+            self.event_handler.register_file(entry.path)
+
+    def _run_assemble(self, args):
+        try:
+            self._result_q.put((True, assemble(args)))
+        except Exception as e:
+            self._result_q.put((False, e))
+
+    def _poll_result(self):
+        try:
+            ok, result = self._result_q.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._poll_result)
+            return
+        self.progress.stop()
+        self.process_button.config(state=tk.NORMAL)
+        self._resume_watcher()
+        if ok:
+            messagebox.showinfo("Success", result)
+        else:
+            logging.error("Processing failed: %s", result)
+            messagebox.showerror("Error", f"Processing failed: {str(result)}")
 
     def on_closing(self):
-        # Stop observer and clean up temporary folder
+        # Stop observer and clean up temporary folder without blocking the window close
         try:
             self.observer.stop()
-            self.observer.join(timeout=2.0)
         except Exception as e:
-            logging.error(f"Error stopping observer: {e}")
+            logging.error("Error stopping observer: %s", e)
+        threading.Thread(target=self._remove_working_folder).start()
+        self.root.destroy()
+
+    def _remove_working_folder(self):
         try:
-            shutil.rmtree(self.working_folder)
-            logging.info(f"Temporary folder deleted: {self.working_folder}")
+            _fast_rmtree(self.working_folder)
+            logging.info("Temporary folder deleted: %s", self.working_folder)
         except Exception as e:
-            logging.error(f"Error cleaning up folder: {e}")
-        self.root.destroy()
+            logging.error("Error cleaning up folder: %s", e)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Drag-and-drop front end for assembling carousel videos.')
+    parser.add_argument('--verbose', action='store_true', help='Enable debug logging')
+    cli_args = parser.parse_args()
+    if cli_args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
     root = tk.Tk()
     app = DragDropApp(root)
     root.mainloop()
\ No newline at end of file
@@ -1,36 +1,123 @@
 import os
 import subprocess
 import argparse
+import asyncio
+import hashlib
+import json
+import math
+import shutil
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
-from functools import partial
+from functools import lru_cache, wraps
 import uuid
 import tempfile
 
+try:
+    from PIL import Image, ImageFilter
+except ImportError:
+    Image = None  # image backgrounds are blurred by ffmpeg instead
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads  # also accepts UTF-8 bytes
+
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png'}
+
+# Only errors reach stderr, so the captured output stays small and is just the failure reason
+FFMPEG = ('ffmpeg', '-nostats', '-loglevel', 'error')
+
+# Probe results persist here between runs unless a cache_dir is given; per user,
+# so nobody else can plant entries or own the directory
+PROBE_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'carousel-maker', 'probe'
+)
+
+# RAM-backed scratch space for intermediate clips when it has room
+TMPFS_DIR = '/dev/shm'
+
+def cached_by_file(func):
+    """Memoize func(file_path) on disk, keyed by the file's path, mtime and size.
+
+    An edited file gets a new mtime/size and therefore a new key, so stale
+    entries are never read back.
+    """
+    @wraps(func)
+    def wrapper(file_path, cache_dir=None):
+        cache_dir = cache_dir or PROBE_CACHE_DIR
+        st = os.stat(file_path)
+        key = f"{func.__name__}|{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}"
+        cache_path = os.path.join(cache_dir, f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.json")
+        try:
+            with open(cache_path, 'rb') as f:
+                return tuple(json_loads(f.read()))
+        except (OSError, ValueError):
+            pass  # Missing, unreadable or corrupt entry: probe again
+
+        value = func(file_path)
+        # Write then rename so a partially written entry is never read back
+        temp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            # An unwritable cache only costs the next run a probe, never this render
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        return value
+    return wrapper
+
 def run_ffprobe(file_path, entries, stream='v:0'):
-    """Run ffprobe command and return parsed output."""
+    """Run ffprobe and return its raw JSON output as bytes."""
     cmd = ['ffprobe', '-v', 'error', '-select_streams', stream, 
-           '-show_entries', entries, '-of', 'csv=p=0']
+           '-show_entries', entries, '-of', 'json']
     try:
-        result = subprocess.run(
-            cmd + [file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-            text=True, check=True, encoding='utf-8'
-        )
-        return result.stdout.strip()
+        # Bytes go straight to the JSON parser; no locale-dependent decoding
+        result = subprocess.run(cmd + [file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return result.stdout
     except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"ffprobe error: {e.stderr}")
+        raise RuntimeError(f"ffprobe error: {e.stderr.decode(errors='replace')}")
 
-def get_dimensions(file_path):
-    """Get width and height of a media file using ffprobe."""
-    width, height = map(int, run_ffprobe(file_path, 'stream=width,height').split(','))
-    return width, height
+@cached_by_file
+def probe_media(file_path):
+    """Get width, height and duration of a media file with a single ffprobe call."""
+    info = json_loads(run_ffprobe(file_path, 'stream=width,height:format=duration'))
+    stream = info['streams'][0]
+    try:
+        duration = float(info.get('format', {}).get('duration', 0.0))
+    except ValueError:  # 'N/A' for some still images
+        duration = 0.0
+    return int(stream['width']), int(stream['height']), duration
+
+# Encoder arguments per --hwaccel choice, tuned for speed like the libx264 ultrafast/crf 28 default
+VIDEO_ENCODERS = {
+    'none': ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '28'],
+    'nvenc': ['-c:v', 'h264_nvenc', '-preset', 'p1', '-tune', 'ull', '-cq', '28'],
+    'qsv': ['-c:v', 'h264_qsv', '-preset', 'veryfast', '-global_quality', '28'],
+    'videotoolbox': ['-c:v', 'h264_videotoolbox', '-q:v', '60'],
+}
 
-def get_duration(file_path):
-    """Get duration of a video file using ffprobe."""
+@lru_cache(maxsize=None)
+def available_encoders():
+    """Return the names of the encoders compiled into ffmpeg (queried once per process)."""
     try:
-        return float(run_ffprobe(file_path, 'format=duration', stream='v:0'))
-    except ValueError:
-        return 0.0
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return frozenset()
+    return frozenset(line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1)
+
+def video_encoder_args(hwaccel):
+    """Return ffmpeg video encoder arguments for a --hwaccel choice ('auto' picks the first available)."""
+    if hwaccel == 'auto':
+        encoders = available_encoders()
+        hwaccel = next((name for name in ('nvenc', 'qsv', 'videotoolbox')
+                        if VIDEO_ENCODERS[name][1] in encoders), 'none')
+    return VIDEO_ENCODERS[hwaccel]
 
 def validate_16_9_aspect_ratio(width, height):
     """Validate that width and height form a 16:9 aspect ratio."""
@@ -42,6 +129,28 @@ def get_resolution_dimensions(resolution):
     presets = {'720p': (1280, 720), '1080p': (1920, 1080), '4k': (3840, 2160)}
     return presets[resolution]
 
+def transcode_rendition(source_file, output_file, width, height, hwaccel='none'):
+    """Scale an already assembled carousel down to another resolution, copying its audio."""
+    cmd = [
+        *FFMPEG, '-i', str(source_file), '-vf', f'scale={width}:{height}',
+        *video_encoder_args(hwaccel), '-pix_fmt', 'yuv420p',
+        '-c:a', 'copy', '-movflags', '+faststart', str(output_file), '-y'
+    ]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"FFmpeg error creating {width}x{height} rendition: {e.stderr}")
+
+def pick_temp_root(required_bytes):
+    """Return TMPFS_DIR if it exists with room to spare for required_bytes, else None (system temp dir)."""
+    try:
+        # Leave headroom: tmpfs shares its space with everything else in RAM
+        if os.path.isdir(TMPFS_DIR) and shutil.disk_usage(TMPFS_DIR).free > 2 * required_bytes:
+            return TMPFS_DIR
+    except OSError:
+        pass
+    return None
+
 def check_file_writable(file_path):
     """Ensure output file path is writable."""
     file_path = Path(file_path)
@@ -49,64 +158,100 @@ def check_file_writable(file_path):
     if not os.access(file_path.parent, os.W_OK):
         raise PermissionError(f"No write permission for {file_path.parent}")
 
-def concatenate_batch(temp_files, clip_durations, transition_duration, output_file, width, height):
-    """Concatenate a batch of clips with crossfade transitions."""
-    if len(temp_files) == 1:
-        os.rename(temp_files[0], output_file)
-        return
-
-    inputs = [f'-i "{temp_file}"' for temp_file in temp_files]
-    filter_complex = []
-    current_offset = 0
-    last_video, last_audio = "[0:v]", "[0:a]"
-    for i in range(1, len(temp_files)):
-        offset = max(0, current_offset + clip_durations[i-1] - transition_duration)
-        filter_complex.append(
-            f"{last_video}[{i}:v]xfade=transition=fade:duration={transition_duration}:offset={offset}[v{i}];"
-            f"{last_audio}[{i}:a]acrossfade=d={transition_duration}[a{i}]"
-        )
-        last_video, last_audio = f"[v{i}]", f"[a{i}]"
-        current_offset = offset
-
-    cmd = (
-        f'ffmpeg {" ".join(inputs)} -filter_complex "{';'.join(filter_complex)}" '
-        f'-map "{last_video}" -map "{last_audio}" -c:v libx264 -pix_fmt yuv420p '
-        f'-preset ultrafast -crf 28 -c:a aac -b:a 128k -movflags +faststart "{output_file}" -y'
-    )
+async def run_ffmpeg(cmd, error_message):
+    """Run ffmpeg without blocking the event loop; raise RuntimeError with its stderr on failure."""
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     try:
-        subprocess.run(cmd, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"FFmpeg error: {e.stderr}")
-
-def process_file(file, idx, args, width, height, fps, temp_dir):
-    """Process a single file to create a clip with zoomed background and optional fading filename overlay."""
-    is_image = file.suffix.lower() in {'.jpg', '.jpeg', '.png'}
-    temp_mp4 = os.path.join(temp_dir, f'temp_{idx:03d}_{uuid.uuid4().hex}.mp4')
-    clip_duration = args.image_duration if is_image else min(get_duration(str(file)), args.max_video_duration)
-    if idx < args.total_files - 1:
-        clip_duration += args.transition_duration
-
-    scale_factor = 1.0
-    larger_width, larger_height = int(width * scale_factor), int(height * scale_factor)
+        _, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        # Another clip failed; don't leave this encode running in the background
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise RuntimeError(f"{error_message}: {stderr.decode(errors='replace')}")
+
+async def concat_files(input_files, output_file, temp_dir):
+    """Join clips that share codec parameters with the concat demuxer (stream copy).
+
+    Only this final pass moves the moov atom to the front; intermediate clips skip it.
+    """
+    list_file = os.path.join(temp_dir, f"concat_list_{uuid.uuid4().hex}.txt")
+    with open(list_file, 'w', encoding='utf-8') as f:
+        # Single quotes inside a concat-list path are written as '\''
+        f.writelines("file '{}'\n".format(str(input_file).replace("'", "'\\''")) for input_file in input_files)
+    cmd = [
+        *FFMPEG, '-f', 'concat', '-safe', '0', '-i', list_file, '-c:v', 'copy', '-c:a', 'copy',
+        '-movflags', '+faststart', str(output_file), '-y'
+    ]
+    await run_ffmpeg(cmd, "FFmpeg error during concatenation")
+
+def render_image_background(file, width, height, blur_radius, opacity, temp_dir):
+    """Blur and dim an image's background once with Pillow instead of on every frame in ffmpeg.
+
+    Returns the path of a width x height PNG covering the frame.
+    """
+    with Image.open(file) as img:
+        img = img.convert('RGB')
+    scale = max(width / img.width, height / img.height)
+    size = (max(width, round(img.width * scale)), max(height, round(img.height * scale)))
+    img = img.resize(size, Image.BICUBIC)
+    left, top = (size[0] - width) // 2, (size[1] - height) // 2
+    img = img.crop((left, top, left + width, top + height)).filter(ImageFilter.GaussianBlur(blur_radius))
+    if opacity < 1.0:
+        img = img.point(lambda v: int(v * opacity))
+    bg_file = os.path.join(temp_dir, f'bg_{uuid.uuid4().hex}.png')
+    img.save(bg_file, compress_level=1)  # read back once, so favour speed over size
+    return bg_file
+
+def build_clip_filter(file, idx, args, width, height, fps, video_in, audio_in, label, bg_in=None):
+    """Build the filtergraph for one clip with zoomed background and optional fading filename overlay.
+
+    Reads [video_in] and [audio_in] and writes [v<label>] and [a<label>], so several
+    clips can share one ffmpeg process. If bg_in is given it is a single pre-blurred
+    background frame and only gets zoomed. Returns the graph and the clip duration.
+    """
+    is_image = file.suffix.lower() in IMAGE_EXTS
+    w, h, duration = probe_media(str(file), args.extract_cache_dir)
+    clip_duration = args.image_duration if is_image else min(duration, args.max_video_duration)
+
+    # The background is blurred at a quarter of the frame size (a sixteenth of the
+    # pixels); zoompan scales it back up to the output size
+    bg_width, bg_height = max(2, width // 4), max(2, height // 4)
+    # Three box passes of radius r approximate a Gaussian with sigma r. boxblur rejects
+    # radii over half the chroma plane, which is half the frame size in yuv420p
+    blur_limit = min(bg_width, bg_height) // 4
+    bg_blur = ''
+    if args.blur_radius >= 2 and blur_limit:
+        bg_blur = f',boxblur={max(1, min(round(args.blur_radius / 4), blur_limit))}:3'
     total_frames = int(fps * clip_duration)
-    zoom_expr = f"{args.zoom_start}+({args.zoom_end}-{args.zoom_start})*on/{total_frames}"
-    x_expr, y_expr = f"(iw-iw*{zoom_expr})/2", f"(ih-ih*{zoom_expr})/2"
+    # Linear zoom as a per-frame increment on zoompan's previous zoom, so each frame
+    # evaluates one addition instead of the full interpolation
+    zoom_step = (args.zoom_end - args.zoom_start) / max(total_frames, 1)
+    zoom_expr = f"if(eq(on,0),{args.zoom_start},zoom+{zoom_step:.8f})"
+    x_expr, y_expr = "(iw-iw*zoom)/2", "(ih-ih*zoom)/2"
     
-    w, h = get_dimensions(str(file))
     scale = min(width / w, height / h) * args.overlay_scale
     scaled_w, scaled_h = int(w * scale), int(h * scale)
     x, y = (width - scaled_w) // 2, (height - scaled_h) // 2
 
-    input_cmd = f'-loop 1 -i "{file}"' if is_image else f'-i "{file}"'
-    audio_cmd = '-f lavfi -i anullsrc=channel_layout=stereo:sample_rate=44100' if is_image else ''
-    filter_complex = (
-        f'[0:v]scale={larger_width}:{larger_height}:force_original_aspect_ratio=increase,'
-        f'crop={larger_width}:{larger_height},gblur=sigma={args.blur_radius},'
-        f'zoompan=z=\'{zoom_expr}\':x=\'{x_expr}\':y=\'{y_expr}\':d={total_frames}:s={width}x{height}:fps={fps},'
-        f'colorchannelmixer=rr={args.background_opacity}:gg={args.background_opacity}:bb={args.background_opacity}[bg];'
-        f'[0:v]scale={scaled_w}:{scaled_h},format=rgba,colorchannelmixer=aa=0.8[overlay];'
-        f'[bg][overlay]overlay={x}:{y}[v]'
-    )
+    zoompan = f"zoompan=z='{zoom_expr}':x='{x_expr}':y='{y_expr}':d={total_frames}:s={width}x{height}:fps={fps}"
+    # Graph chains and each chain's filters are collected and joined once at the end
+    overlay_in = video_in
+    if bg_in:
+        chains = [f'[{bg_in}]{zoompan}[bg{label}]']
+    else:
+        # Decode the source once and feed both the background and overlay branches
+        overlay_in = f'src{label}'
+        chains = [
+            f'[{video_in}]split=2[bgsrc{label}][{overlay_in}]',
+            f'[bgsrc{label}]scale={bg_width}:{bg_height}:force_original_aspect_ratio=increase,'
+            f'crop={bg_width}:{bg_height}{bg_blur},{zoompan},'
+            f'colorchannelmixer=rr={args.background_opacity}:gg={args.background_opacity}:bb={args.background_opacity}[bg{label}]'
+        ]
+    chains.append(f'[{overlay_in}]scale={scaled_w}:{scaled_h},format=rgba,colorchannelmixer=aa=0.8[overlay{label}]')
+    # Trimmed in the graph so the clip also ends on time inside a concat
+    video_filters = [f'[bg{label}][overlay{label}]overlay={x}:{y}', f'trim=duration={clip_duration}']
 
     if args.draw_text:
         filename = file.name.replace("'", "'\\''")
@@ -118,31 +263,138 @@ def process_file(file, idx, args, width, height, fps, temp_dir):
         if fade_in_end >= fade_out_start:
             raise ValueError(f"Fade-in end time ({fade_in_end}s) must be less than fade-out start time ({fade_out_start}s)")
         
-        filter_complex = (
-            f'[0:v]scale={larger_width}:{larger_height}:force_original_aspect_ratio=increase,'
-            f'crop={larger_width}:{larger_height},gblur=sigma={args.blur_radius},'
-            f'zoompan=z=\'{zoom_expr}\':x=\'{x_expr}\':y=\'{y_expr}\':d={total_frames}:s={width}x{height}:fps={fps},'
-            f'colorchannelmixer=rr={args.background_opacity}:gg={args.background_opacity}:bb={args.background_opacity}[bg];'
-            f'[0:v]scale={scaled_w}:{scaled_h},format=rgba,colorchannelmixer=aa=0.8[overlay];'
-            f'[bg][overlay]overlay={x}:{y},'
+        video_filters.append(
             f'drawtext=text=\'{filename}\':fontfile=Anton-Regular.ttf:'
             f'fontcolor=yellow:fontsize={font_size}:x=(w-text_w)/2:y={text_y}:'
             f'borderw=2:bordercolor=black:'
-            f'alpha=\'if(lt(t,{args.text_fade_in}),t/{args.text_fade_in},if(gt(t,{fade_out_start}),1-(t-{fade_out_start})/{args.text_fade_out},1))\'[v]'
+            f'alpha=\'if(lt(t,{args.text_fade_in}),t/{args.text_fade_in},if(gt(t,{fade_out_start}),1-(t-{fade_out_start})/{args.text_fade_out},1))\''
         )
 
-    audio_filter = f'[0:a]atrim=0:{clip_duration},asetpts=PTS-STARTPTS[a]' if not is_image else f'[1:a]atrim=0:{clip_duration},asetpts=PTS-STARTPTS[a]'
-    
-    cmd = (
-        f'ffmpeg {input_cmd} {audio_cmd} -filter_complex "{filter_complex};{audio_filter}" '
-        f'-map "[v]" -map "[a]" -t {clip_duration} -c:v libx264 -pix_fmt yuv420p '
-        f'-preset ultrafast -crf 28 -c:a aac -b:a 128k -movflags +faststart -threads 1 "{temp_mp4}" -y'
-    )
+    # Each clip fades through black at its joins so clips can be stream-copied
+    # together instead of re-encoded for xfade
+    half_transition = args.transition_duration / 2
+    # Same sample rate and layout for every clip so the concat demuxer can copy audio
+    audio_filters = [
+        f'[{audio_in}]atrim=0:{clip_duration}', 'asetpts=PTS-STARTPTS',
+        'aresample=44100', 'aformat=channel_layouts=stereo'
+    ]
+    if half_transition > 0 and idx > 0:
+        video_filters.append(f'fade=t=in:st=0:d={half_transition}')
+        audio_filters.append(f'afade=t=in:st=0:d={half_transition}')
+    if half_transition > 0 and idx < args.total_files - 1:
+        video_filters.append(f'fade=t=out:st={clip_duration - half_transition}:d={half_transition}')
+        audio_filters.append(f'afade=t=out:st={clip_duration - half_transition}:d={half_transition}')
+    chains.append(','.join(video_filters) + f'[v{label}]')
+    chains.append(','.join(audio_filters) + f'[a{label}]')
+    filter_complex = ';'.join(chains)
+    return filter_complex, clip_duration
+
+def build_clips_command(clips, args, width, height, fps, temp_dir):
+    """Build one ffmpeg command rendering a group of (idx, file) clips to one temp file per clip.
+
+    Returns (cmd, results) where results is a list of (idx, temp_mp4, clip_duration).
+    """
+    cmd, graphs, results = [*FFMPEG], [], []
+    images = [k for k, (_, file) in enumerate(clips) if file.suffix.lower() in IMAGE_EXTS]
+    for idx, file in clips:
+        if file.suffix.lower() in IMAGE_EXTS:
+            cmd += ['-loop', '1', '-t', str(args.image_duration), '-i', str(file)]
+        else:
+            cmd += ['-i', str(file)]
+
+    # Images get silent audio; one generator is split between every image in the group
+    audio_inputs = {}
+    if images:
+        cmd += ['-f', 'lavfi', '-i', 'anullsrc=channel_layout=stereo:sample_rate=44100']
+        if len(images) == 1:
+            audio_inputs[images[0]] = f'{len(clips)}:a'
+        else:
+            graphs.append(f'[{len(clips)}:a]asplit={len(images)}' + ''.join(f'[silence{k}]' for k in images))
+            audio_inputs.update((k, f'silence{k}') for k in images)
+
+    # A still background only needs blurring once; zoompan turns the single
+    # frame into the whole clip
+    bg_inputs = {}
+    if Image is not None:
+        for k in images:
+            bg_file = render_image_background(
+                clips[k][1], width, height, args.blur_radius, args.background_opacity, temp_dir
+            )
+            bg_inputs[k] = f'{len(clips) + 1 + len(bg_inputs)}:v'
+            cmd += ['-i', bg_file]
+
+    # Encoder options are identical for every output, so build them once
+    output_opts = [
+        *video_encoder_args(args.hwaccel), '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-b:a', '128k',
+        '-threads', str(args.ffmpeg_threads)
+    ]
+    durations = []
+    for k, (idx, file) in enumerate(clips):
+        graph, clip_duration = build_clip_filter(
+            file, idx, args, width, height, fps, f'{k}:v', audio_inputs.get(k, f'{k}:a'), k, bg_inputs.get(k)
+        )
+        graphs.append(graph)
+        durations.append(clip_duration)
+
+    if len(clips) == 1:
+        temp_mp4 = os.path.join(temp_dir, f'temp_{clips[0][0]:03d}_{uuid.uuid4().hex}.mp4')
+        cmd += ['-filter_complex', ';'.join(graphs), '-map', '[v0]', '-map', '[a0]',
+                '-t', str(durations[0]), *output_opts, temp_mp4, '-y']
+        return cmd, [(clips[0][0], temp_mp4, durations[0])]
+
+    # Several clips are concatenated in the graph and encoded by one encoder session;
+    # the segment muxer cuts the stream back into one file per clip at forced
+    # keyframes on the clip boundaries
+    graphs.append(''.join(f'[v{k}][a{k}]' for k in range(len(clips))) + f'concat=n={len(clips)}:v=1:a=1[vcat][acat]')
+    # trim=duration keeps whole frames, rounding each clip up to the next frame, so
+    # the cuts are counted in frames rather than summed from nominal durations
+    boundaries, elapsed_frames = [], 0
+    for clip_duration in durations[:-1]:
+        elapsed_frames += math.ceil(round(clip_duration * fps, 6))
+        boundaries.append(f'{elapsed_frames / fps:.6f}')
+    pattern = os.path.join(temp_dir, f'seg_{uuid.uuid4().hex}_%03d.mp4')
+    cmd += [
+        '-filter_complex', ';'.join(graphs), '-map', '[vcat]', '-map', '[acat]', *output_opts,
+        '-force_key_frames', ','.join(boundaries), '-f', 'segment', '-segment_times', ','.join(boundaries),
+        '-reset_timestamps', '1', pattern, '-y'
+    ]
+    results = [(idx, pattern % k, clip_duration) for k, ((idx, _), clip_duration) in enumerate(zip(clips, durations))]
+    return cmd, results
+
+async def process_clips(clips, args, width, height, fps, temp_dir, semaphore):
+    """Render a group of clips once a worker slot is free; returns build_clips_command's results."""
+    async with semaphore:
+        # Probing and Pillow background blurs run off the event loop but inside the
+        # worker slot, so they count against the same core budget as the encodes
+        cmd, results = await asyncio.to_thread(build_clips_command, clips, args, width, height, fps, temp_dir)
+        await run_ffmpeg(cmd, f"FFmpeg error processing {', '.join(file.name for _, file in clips)}")
+    return results
+
+async def render_carousel(groups, args, width, height, workers, output_file, temp_dir):
+    """Encode clip groups concurrently and concatenate them into output_file.
+
+    At most `workers` encodes run at once. All clips are joined by one stream-copy
+    concat, so no intermediate batch files are written and read back.
+    """
+    semaphore = asyncio.Semaphore(workers)
+    tasks = [
+        asyncio.ensure_future(process_clips(group, args, width, height, 30, temp_dir, semaphore))
+        for group in groups
+    ]
     try:
-        subprocess.run(cmd, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
-        return temp_mp4, clip_duration
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"FFmpeg error processing {file}: {e.stderr}")
+        rendered = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    temp_files = [temp_mp4 for _, temp_mp4, _ in sorted(clip for group in rendered for clip in group)]
+    for temp_mp4 in temp_files:
+        if not os.path.exists(temp_mp4) or os.path.getsize(temp_mp4) == 0:
+            raise FileNotFoundError(f"Temporary file {temp_mp4} is missing or empty")
+    # Even a single clip goes through concat: it is the one pass that applies +faststart
+    await concat_files(temp_files, output_file, temp_dir)
 
 def assemble(args):
     if not 0.0 < args.overlay_scale <= 1.0:
@@ -157,68 +409,74 @@ def assemble(args):
     if not 0.0 <= args.background_opacity <= 1.0:
         raise ValueError("Background opacity must be between 0.0 and 1.0")
 
+    # Render the largest requested resolution; smaller ones are chained from it afterwards
+    resolutions = sorted(args.resolutions or [], key=lambda r: get_resolution_dimensions(r)[0], reverse=True)
+    if resolutions:
+        args.resolution = resolutions[0]
     width, height = args.resolution and get_resolution_dimensions(args.resolution) or (args.width or 1280, args.height or 720)
     validate_16_9_aspect_ratio(width, height)
     check_file_writable(args.output_file)
 
-    input_dir = Path(args.input_dir)
-    supported_exts = {'.jpg', '.jpeg', '.png', '.mp4'}
-    files = sorted(f for f in input_dir.iterdir() if f.suffix.lower() in supported_exts)
+    if args.files:
+        # Caller already knows the order (e.g. the drag-and-drop app); skip the directory scan
+        files = [Path(f) for f in args.files]
+    else:
+        supported_exts = frozenset({'.jpg', '.jpeg', '.png', '.mp4'})
+        # scandir's entries already know their type; only selected files become Paths
+        with os.scandir(args.input_dir) as it:
+            files = sorted(
+                Path(entry.path) for entry in it
+                if os.path.splitext(entry.name)[1].lower() in supported_exts and entry.is_file()
+            )
     if not files:
         raise FileNotFoundError("No supported files found")
     args.total_files = len(files)
 
-    batch_size = max(1, min(10, args.threads * 2))
+    workers = args.threads or os.cpu_count() or 1  # 0 means one worker per core
+    # Keep workers * threads per ffmpeg close to the core count so parallel encodes
+    # don't oversubscribe the CPU
+    args.ffmpeg_threads = args.ffmpeg_threads or max(1, (os.cpu_count() or 1) // workers)
     output_file = Path(args.output_file).resolve()
+
+    # Runs of consecutive images share one ffmpeg process (startup and filtergraph
+    # setup paid once per group); videos are rendered on their own. Groups stay
+    # small enough that every worker still gets work.
+    group_size = max(1, min(10, workers * 2, -(-len(files) // workers)))
+    groups = []
+    for idx, file in enumerate(files):
+        if (file.suffix.lower() in IMAGE_EXTS and groups and len(groups[-1]) < group_size
+                and groups[-1][-1][1].suffix.lower() in IMAGE_EXTS):
+            groups[-1].append((idx, file))
+        else:
+            groups.append([(idx, file)])
     
-    with tempfile.TemporaryDirectory() as temp_dir:
-        with ThreadPoolExecutor(max_workers=args.threads) as executor:
-            for batch_idx, start_idx in enumerate(range(0, len(files), batch_size)):
-                batch_files = files[start_idx:start_idx + batch_size]
-                results = executor.map(
-                    partial(process_file, args=args, width=width, height=height, fps=30, temp_dir=temp_dir),
-                    batch_files, range(len(batch_files))
-                )
-                
-                batch_temp_files, batch_clip_durations = [], []
-                for temp_mp4, clip_duration in results:
-                    if not os.path.exists(temp_mp4) or os.path.getsize(temp_mp4) == 0:
-                        raise FileNotFoundError(f"Temporary file {temp_mp4} is missing or empty")
-                    batch_temp_files.append(temp_mp4)
-                    batch_clip_durations.append(clip_duration)
-                
-                batch_output = os.path.join(temp_dir, f"batch_{batch_idx:03d}_{uuid.uuid4().hex}.mp4")
-                concatenate_batch(batch_temp_files, batch_clip_durations, args.transition_duration, batch_output, width, height)
-                
-                if batch_idx == 0:
-                    if os.path.exists(output_file):
-                        os.remove(output_file)
-                    os.rename(batch_output, output_file)
-                else:
-                    temp_concat_file = os.path.join(temp_dir, f"temp_concat_{uuid.uuid4().hex}.mp4")
-                    list_file = os.path.join(temp_dir, f"concat_list_{uuid.uuid4().hex}.txt")
-                    with open(list_file, 'w') as f:
-                        f.write(f"file '{output_file}'\n")
-                        f.write(f"file '{batch_output}'\n")
-                    cmd = (
-                        f'ffmpeg -f concat -safe 0 -i "{list_file}" -c:v copy -c:a copy '
-                        f'-movflags +faststart "{temp_concat_file}" -y'
-                    )
-                    try:
-                        subprocess.run(cmd, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
-                        if os.path.exists(output_file):
-                            os.remove(output_file)
-                        os.rename(temp_concat_file, output_file)
-                    except subprocess.CalledProcessError as e:
-                        raise RuntimeError(f"FFmpeg error during concatenation: {e.stderr}")
-    
-    return f"Carousel video created: {output_file}"
+    # Rough upper bound on the encoded clips: ~1 byte per pixel per second at these settings
+    temp_root = args.tmp_dir or pick_temp_root(
+        len(files) * max(args.image_duration, args.max_video_duration) * width * height
+    )
+    with tempfile.TemporaryDirectory(dir=temp_root) as temp_dir:
+        asyncio.run(render_carousel(
+            groups, args, width, height, workers, output_file, temp_dir
+        ))
+
+    # Each rendition is scaled from the previous (next larger) one rather than
+    # re-running the whole pipeline on the sources
+    source_file, created = output_file, [output_file]
+    for resolution in resolutions[1:]:
+        rendition = output_file.with_name(f"{output_file.stem}_{resolution}{output_file.suffix}")
+        transcode_rendition(source_file, rendition, *get_resolution_dimensions(resolution), args.hwaccel)
+        created.append(rendition)
+        source_file = rendition
+
+    return f"Carousel video created: {', '.join(map(str, created))}"
 
 def main():
-    parser = argparse.ArgumentParser(description='Assemble a carousel video with zooming background and crossfade transitions (16:9).')
+    parser = argparse.ArgumentParser(description='Assemble a carousel video with zooming background and fade transitions (16:9).')
     parser.add_argument('--input-dir', required=True, help='Directory with image/video assets')
     parser.add_argument('--output-file', required=True, help='Output MP4 file path')
     parser.add_argument('--resolution', choices=['720p', '1080p', '4k'], help='Resolution preset')
+    parser.add_argument('--resolutions', nargs='+', choices=['720p', '1080p', '4k'],
+                        help='Render several resolution presets; the largest is the main output, others get a _<preset> suffix')
     parser.add_argument('--width', type=int, help='Canvas width (16:9 ratio with height)')
     parser.add_argument('--height', type=int, help='Canvas height (16:9 ratio with width)')
     parser.add_argument('--image-duration', type=float, default=5, help='Image duration in seconds')
@@ -227,12 +485,19 @@ def main():
     parser.add_argument('--zoom-start', type=float, default=1.0, help='Background zoom start')
     parser.add_argument('--zoom-end', type=float, default=1.2, help='Background zoom end')
     parser.add_argument('--overlay-scale', type=float, default=0.9, help='Overlay scale factor (0.0 to 1.0)')
-    parser.add_argument('--transition-duration', type=float, default=1.0, help='Crossfade transition duration in seconds')
+    parser.add_argument('--transition-duration', type=float, default=1.0, help='Fade-through-black transition duration in seconds')
     parser.add_argument('--text-fade-in', type=float, default=0.5, help='Time to complete text fade-in from start of clip (seconds)')
     parser.add_argument('--text-fade-out', type=float, default=0.5, help='Time to complete text fade-out before end of clip (seconds)')
     parser.add_argument('--background-opacity', type=float, default=1.0, help='Background luminosity (0.0 to 1.0, lower is darker)')
-    parser.add_argument('--threads', type=int, default=4, help='Number of parallel processing threads')
+    parser.add_argument('--threads', type=int, default=0, help='Number of parallel processing threads (0 = one per CPU core)')
+    parser.add_argument('--ffmpeg-threads', type=int, default=0,
+                        help='Threads per ffmpeg process (0 = CPU cores divided by --threads)')
+    parser.add_argument('--hwaccel', choices=['auto', *VIDEO_ENCODERS], default='none',
+                        help='Hardware H.264 encoder to use instead of libx264 (auto = first one ffmpeg was built with)')
+    parser.add_argument('--extract-cache-dir', help=f'Directory for caching ffprobe results between runs (default: {PROBE_CACHE_DIR})')
+    parser.add_argument('--tmp-dir', help=f'Directory for intermediate clips (default: {TMPFS_DIR} if it has room, else the system temp dir)')
     parser.add_argument('--draw-text', type=bool, default=True, help='Whether to draw filename text on clips (True/False)')
+    parser.set_defaults(files=None)
     args = parser.parse_args()
     print(assemble(args))
 
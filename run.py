@@ -1,10 +1,56 @@
 import os
 import subprocess
 import argparse
+import asyncio
+import json
+import hashlib
+import struct
 import shutil
 from pathlib import Path
 import time
 import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache, partial
+
+# Hardware H.264 encoders: codec, encoder options, and filters that must end the
+# video graph (VAAPI encodes from GPU surfaces)
+HW_ENCODERS = {
+    'nvenc': ('h264_nvenc', ['-preset', 'p4', '-rc', 'vbr', '-cq', '23'], ''),
+    'vaapi': ('h264_vaapi', ['-vaapi_device', '/dev/dri/renderD128', '-qp', '23'], ',format=nv12,hwupload'),
+    'qsv': ('h264_qsv', ['-preset', 'faster', '-global_quality', '23'], ''),
+}
+
+# Consumer GPUs only allow a few encode sessions at once
+MAX_HW_SESSIONS = 3
+
+# Set in each pool worker by _init_worker
+_hw_slots = None
+_prefetched_probes = {}
+
+PROBE_ARGS = ('-v', 'error', '-show_streams', '-show_format', '-of', 'json')
+
+# Limit on ffprobe processes running at once during the up-front scan
+MAX_CONCURRENT_PROBES = 32
+
+# Per-segment filtergraphs, filled in with str.format_map. The source is decoded
+# once and split; the static blurred background is built from its first frame and
+# held with loop, so the blur runs once. {hold} holds image overlays the same way.
+SEGMENT_VIDEO_FILTER = (
+    '[{input}]split=2[bgsrc{k}][fg{k}];'
+    '[bgsrc{k}]trim=end_frame=1,scale={width}:{height}:force_original_aspect_ratio=increase,'
+    'crop={width}:{height},gblur=sigma={blur_radius},loop=-1:1:0[bg{k}];'
+    '[fg{k}]scale={sw}:{sh}{hold}[overlay{k}];'
+    '[bg{k}][overlay{k}]overlay={x}:{y},format=yuv420p{upload}[v{k}]'
+)
+SEGMENT_AUDIO_FILTER = (
+    '[{input}]atrim=0:{duration},asetpts=PTS-STARTPTS,'
+    'aresample=44100,aformat=channel_layouts=stereo[a{k}]'
+)
+SILENT_AUDIO_INPUT = ('-f', 'lavfi', '-i', 'anullsrc=channel_layout=stereo:sample_rate=44100')
+# Frame rate of image segments: FFmpeg's default for a single still input
+IMAGE_FPS = 25
 
 def get_ffmpeg_path():
     """Get the FFmpeg path, either from PATH or from a specified location."""
@@ -36,22 +82,116 @@ def get_ffmpeg_path():
     else:
         raise FileNotFoundError("FFmpeg executable not found. Please install FFmpeg or provide the correct path.")
 
-def get_dimensions(file_path, ffmpeg_path):
+@lru_cache(maxsize=256)
+def _probe(path, size, mtime, ffprobe_path):
+    """Run ffprobe once per file version; size and mtime are only part of the cache key."""
+    result = subprocess.run([ffprobe_path, *PROBE_ARGS, path], stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(result.stdout)
+
+def probe(file_path, ffprobe_path):
+    """Get ffprobe's streams and format info for a media file, probing it at most once."""
+    info = _prefetched_probes.get(str(file_path))
+    if info is not None:
+        return info
+    st = os.stat(file_path)
+    return _probe(str(file_path), st.st_size, st.st_mtime, ffprobe_path)
+
+async def _probe_async(path, ffprobe_path, semaphore):
+    """Run ffprobe without blocking the event loop; None if it fails."""
+    async with semaphore:
+        proc = await asyncio.create_subprocess_exec(
+            ffprobe_path, *PROBE_ARGS, path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        stdout, _ = await proc.communicate()
+    return json.loads(stdout) if proc.returncode == 0 else None
+
+async def probe_all(paths, ffprobe_path):
+    """Probe every path concurrently; returns {path: info} for the ones ffprobe could read."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROBES)
+    results = await asyncio.gather(*(_probe_async(path, ffprobe_path, semaphore) for path in paths))
+    return {path: info for path, info in zip(paths, results) if info is not None}
+
+def get_dimensions(file_path, ffprobe_path):
     """Get width and height of a media file using ffprobe."""
-    ffprobe_path = ffmpeg_path.replace("ffmpeg.exe", "ffprobe.exe") if ffmpeg_path.endswith("ffmpeg.exe") else ffmpeg_path.replace("ffmpeg", "ffprobe")
-    cmd = [ffprobe_path, '-v', 'error', '-select_streams', 'v:0', 
-           '-show_entries', 'stream=width,height', '-of', 'csv=p=0', file_path]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, check=True)
-    width, height = map(int, result.stdout.strip().split(','))
-    return width, height
-
-def get_duration(file_path, ffmpeg_path):
+    stream = next(s for s in probe(file_path, ffprobe_path)['streams'] if s['codec_type'] == 'video')
+    return int(stream['width']), int(stream['height'])
+
+def get_duration(file_path, ffprobe_path):
     """Get duration of a video file using ffprobe."""
-    ffprobe_path = ffmpeg_path.replace("ffmpeg.exe", "ffprobe.exe") if ffmpeg_path.endswith("ffmpeg.exe") else ffmpeg_path.replace("ffmpeg", "ffprobe")
-    cmd = [ffprobe_path, '-v', 'error', '-show_entries', 'format=duration', 
-           '-of', 'csv=p=0', file_path]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, check=True)
-    return float(result.stdout.strip())
+    return float(probe(file_path, ffprobe_path)['format']['duration'])
+
+def has_audio(file_path, ffprobe_path):
+    """Check whether a media file has an audio stream."""
+    return any(s['codec_type'] == 'audio' for s in probe(file_path, ffprobe_path)['streams'])
+
+def audio_copyable(file_path, ffprobe_path):
+    """Check whether the first audio stream is already the AAC-LC stereo 44.1 kHz track segments carry."""
+    stream = next((s for s in probe(file_path, ffprobe_path)['streams'] if s['codec_type'] == 'audio'), None)
+    return (stream is not None and stream.get('codec_name') == 'aac' and stream.get('profile') == 'LC'
+            and stream.get('sample_rate') == '44100' and stream.get('channels') == 2)
+
+# JPEG start-of-frame markers (baseline, progressive, ...); C4, C8 and CC are not frames
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _img_dims(path):
+    """Read width and height from a PNG or JPEG header without ffprobe; None if it can't be parsed."""
+    with open(path, 'rb') as f:
+        head = f.read(24)
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if head[:2] != b'\xff\xd8':
+            return None
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            code = marker[1]
+            while code == 0xFF:  # fill bytes before the marker code
+                code = ord(f.read(1) or b'\0')
+            if code in JPEG_SOF_MARKERS:
+                # Segment length (2), sample precision (1), then height and width
+                segment = f.read(7)
+                if len(segment) < 7:
+                    return None
+                h, w = struct.unpack('>HH', segment[3:7])
+                return w, h
+            if code in (0xD9, 0xDA):  # end of image / start of scan without a frame header
+                return None
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            f.seek(struct.unpack('>H', length)[0] - 2, os.SEEK_CUR)
+
+def detect_hw_encoder(ffmpeg_path):
+    """Get the name of the first HW_ENCODERS entry this FFmpeg build supports, or None."""
+    try:
+        result = subprocess.run([ffmpeg_path, '-hide_banner', '-encoders'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    for name, (codec, _, _) in HW_ENCODERS.items():
+        if codec in result.stdout:
+            return name
+    return None
+
+def _init_worker(hw_slots, probes):
+    """Hand a pool worker the hardware encode semaphore and the up-front probe results."""
+    global _hw_slots, _prefetched_probes
+    _hw_slots, _prefetched_probes = hw_slots, probes
+
+def segment_cache_key(file_path, *settings):
+    """Key a rendered segment by the source's leading bytes, size and mtime plus every render setting.
+
+    Only a bounded prefix is hashed so a cache miss on a multi-GB video stays cheap;
+    size and mtime catch in-place edits beyond it.
+    """
+    digest = hashlib.blake2b(repr(settings).encode(), digest_size=16)
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(65536))
+        st = os.fstat(f.fileno())
+    digest.update(f'{st.st_size}|{st.st_mtime_ns}'.encode())
+    return digest.hexdigest()
 
 def ensure_directory_exists(file_path):
     """Ensure the directory for the given file path exists."""
@@ -60,23 +200,26 @@ def ensure_directory_exists(file_path):
         os.makedirs(directory)
         print(f"Created directory: {directory}")
 
-def concat_segments_in_batches(temp_files, temp_dir, ffmpeg_path, output_file, batch_size=10):
-    """Concatenate segments in batches to avoid command line limitations."""
+def concat_segments_in_batches(temp_files, temp_dir, ffmpeg_path, output_file, batch_size=10000):
+    """Concatenate segments, falling back to batches only for extremely long segment lists."""
+    # Segments may be given as bare filenames inside temp_dir
+    temp_files = [temp_dir / tf if isinstance(tf, str) else tf for tf in temp_files]
     if len(temp_files) <= batch_size:
-        # For small numbers of files, use the simple concat demuxer
-        concat_with_concat_demuxer(temp_files, temp_dir, ffmpeg_path, output_file)
+        # The demuxer reads paths from a list file, so one stream-copy pass covers
+        # any realistic number of segments
+        concat_with_concat_demuxer(temp_files, temp_dir / 'list.txt', ffmpeg_path, output_file)
         return
     
-    # For large numbers of files, process in batches
-    batch_outputs = []
-    
-    for i in range(0, len(temp_files), batch_size):
-        batch = temp_files[i:i+batch_size]
-        batch_output = temp_dir / f"batch_{i//batch_size}.mp4"
-        
-        # Process this batch
-        concat_with_concat_demuxer(batch, temp_dir, ffmpeg_path, batch_output)
-        batch_outputs.append(batch_output)
+    # For large numbers of files, process in batches. Stream copies are I/O-bound
+    # and independent, so run them concurrently, each with its own list file.
+    starts = range(0, len(temp_files), batch_size)
+    batch_outputs = [temp_dir / f"batch_{i//batch_size}.mp4" for i in starts]
+    with ThreadPoolExecutor(max_workers=min(8, len(batch_outputs))) as executor:
+        for i, batch_output in zip(starts, batch_outputs):
+            executor.submit(
+                concat_with_concat_demuxer, temp_files[i:i+batch_size], temp_dir / f'list_{i//batch_size}.txt',
+                ffmpeg_path, batch_output
+            )
     
     # Now concatenate the batch outputs
     if len(batch_outputs) == 1:
@@ -94,10 +237,13 @@ def concat_segments_in_batches(temp_files, temp_dir, ffmpeg_path, output_file, b
             # Use absolute path for the list file
             subprocess.run([
                 ffmpeg_path, 
+                '-fflags', '+genpts',
                 '-f', 'concat', 
                 '-safe', '0',
                 '-i', str(batch_list_path.resolve()), 
                 '-c', 'copy',
+                '-avoid_negative_ts', 'make_zero',
+                '-movflags', '+faststart',
                 str(output_file), 
                 '-y'
             ], check=True)
@@ -109,27 +255,25 @@ def concat_segments_in_batches(temp_files, temp_dir, ffmpeg_path, output_file, b
                 shutil.copy(str(batch_outputs[0]), str(output_file))
                 print(f"Only copied the first batch as fallback: {output_file}")
 
-def concat_with_concat_demuxer(temp_files, temp_dir, ffmpeg_path, output_file):
-    """Use FFmpeg's concat demuxer to concatenate segments."""
-    list_file_path = temp_dir / 'list.txt'
-    with open(list_file_path, 'w') as f:
-        for tf in temp_files:
-            # Ensure we have the full path for each file
-            if isinstance(tf, str):
-                full_path = temp_dir / tf
-            else:
-                full_path = tf
-            # Use absolute paths to avoid path resolution issues
-            f.write(f"file '{full_path.resolve()}'\n")
+def concat_with_concat_demuxer(temp_files, list_file_path, ffmpeg_path, output_file):
+    """Use FFmpeg's concat demuxer to concatenate segments.
+
+    temp_files are full paths; list_file_path is written once and must be unique
+    per concurrent call.
+    """
+    # Use absolute paths to avoid path resolution issues
+    list_file_path.write_text(''.join(f"file '{Path(tf).resolve()}'\n" for tf in temp_files))
     
     try:
-        # Use absolute path for the list file
         subprocess.run([
             ffmpeg_path, 
+            '-fflags', '+genpts',
             '-f', 'concat', 
             '-safe', '0',
-            '-i', str(list_file_path.resolve()), 
+            '-i', str(list_file_path), 
             '-c', 'copy',
+            '-avoid_negative_ts', 'make_zero',
+            '-movflags', '+faststart',
             str(output_file), 
             '-y'
         ], check=True)
@@ -139,38 +283,40 @@ def concat_with_concat_demuxer(temp_files, temp_dir, ffmpeg_path, output_file):
         print(f"Error using concat demuxer: {e}")
         return False
 
-def create_animated_background(ffmpeg_path, temp_frame_path, width, height, blur_radius, 
-                             duration, temp_dir, bg_animation_style="zoom_in"):
+def create_animated_background(ffmpeg_path, source_path, width, height, blur_radius, 
+                             duration, temp_dir, bg_animation_style="zoom_in",
+                             preset="fast", crf=23, threads=0, encoder=None):
     """
     Create an animated background with motion effect.
     
     Args:
         ffmpeg_path: Path to FFmpeg executable
-        temp_frame_path: Path to the source frame
+        source_path: Image or video whose first frame is animated; read in place
         width: Canvas width
         height: Canvas height
         blur_radius: Blur radius for the background
         duration: Duration of the animation in seconds
         temp_dir: Temporary directory
         bg_animation_style: Animation style ("zoom_in", "zoom_out", "pan_right", "pan_left", "random")
+        preset: libx264 preset
+        crf: libx264 constant rate factor
+        threads: libx264 threads (0 lets FFmpeg decide)
+        encoder: (codec, options, final filters) from HW_ENCODERS; libx264 if None
     
     Returns:
         Path to the animated background video file
     """
-    # First create a blurred background image
-    temp_blurred_img = temp_dir / 'temp_blurred_bg.jpg'
-    
     # Make the blur image slightly larger than needed for movement
     scale_factor = 1.2  # 20% larger to allow for movement
     larger_width = int(width * scale_factor)
     larger_height = int(height * scale_factor)
     
-    subprocess.run([
-        ffmpeg_path, '-i', str(temp_frame_path),
-        '-vf', f'scale={larger_width}:{larger_height}:force_original_aspect_ratio=increase,'
-               f'crop={larger_width}:{larger_height},gblur=sigma={blur_radius}',
-        str(temp_blurred_img), '-y'
-    ], check=True)
+    # Blurred in the same graph as the animation, so there is no intermediate
+    # JPEG to encode, decode and pick up compression artifacts from
+    blur_filters = (
+        f'scale={larger_width}:{larger_height}:force_original_aspect_ratio=increase,'
+        f'crop={larger_width}:{larger_height},gblur=sigma={blur_radius}'
+    )
     
     # Select animation style
     if bg_animation_style == "random":
@@ -182,62 +328,243 @@ def create_animated_background(ffmpeg_path, temp_frame_path, width, height, blur
     total_frames = int(fps * duration)
     animated_bg_path = temp_dir / 'temp_animated_bg.mp4'
     
+    # Per-frame steps are computed here once, so ffmpeg only adds a constant each
+    # frame instead of evaluating the full interpolation
+    x_step = (larger_width - width) / total_frames
+    y_step = (larger_height - height) / total_frames
+    
     # Configure the animation based on style
-    if bg_animation_style == "zoom_in":
-        # Zoom in: start wide, end closer
-        zoom_start, zoom_end = 1.0, 1.1
-        zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{total_frames}"
-        x_expr = f"(iw-iw*{zoom_expr})/2"
-        y_expr = f"(ih-ih*{zoom_expr})/2"
-        
-        filter_complex = f'zoompan=z=\'{zoom_expr}\':x=\'{x_expr}\':y=\'{y_expr}\':d={total_frames}:s={width}x{height}:fps={fps}'
-        
-    elif bg_animation_style == "zoom_out":
-        # Zoom out: start close, end wider
-        zoom_start, zoom_end = 1.1, 1.0
-        zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{total_frames}"
-        x_expr = f"(iw-iw*{zoom_expr})/2"
-        y_expr = f"(ih-ih*{zoom_expr})/2"
+    if bg_animation_style in ("zoom_in", "zoom_out"):
+        # Zoom in: start wide, end closer; zoom out: the reverse
+        zoom_start, zoom_end = (1.0, 1.1) if bg_animation_style == "zoom_in" else (1.1, 1.0)
+        zoom_expr = f"if(eq(on,0),{zoom_start},zoom+{(zoom_end - zoom_start) / total_frames:.8f})"
+        x_expr = "(iw-iw*zoom)/2"
+        y_expr = "(ih-ih*zoom)/2"
         
         filter_complex = f'zoompan=z=\'{zoom_expr}\':x=\'{x_expr}\':y=\'{y_expr}\':d={total_frames}:s={width}x{height}:fps={fps}'
         
     elif bg_animation_style == "pan_right":
         # Pan right: move from left to right
-        x_expr = f"on*{larger_width-width}/{total_frames}"
-        
-        filter_complex = f'crop={width}:{height}:{x_expr}:0:s={width}x{height}:fps={fps}'
+        filter_complex = f'fps={fps},crop={width}:{height}:n*{x_step:.6f}:0'
         
     elif bg_animation_style == "pan_left":
         # Pan left: move from right to left
-        x_expr = f"{larger_width-width}-on*{larger_width-width}/{total_frames}"
-        
-        filter_complex = f'crop={width}:{height}:{x_expr}:0:s={width}x{height}:fps={fps}'
+        filter_complex = f'fps={fps},crop={width}:{height}:{larger_width-width}-n*{x_step:.6f}:0'
         
     elif bg_animation_style == "pan_diagonal":
         # Pan diagonally
-        x_expr = f"on*{larger_width-width}/{total_frames}"
-        y_expr = f"on*{larger_height-height}/{total_frames}"
-        
-        filter_complex = f'crop={width}:{height}:{x_expr}:{y_expr}:s={width}x{height}:fps={fps}'
+        filter_complex = f'fps={fps},crop={width}:{height}:n*{x_step:.6f}:n*{y_step:.6f}'
     
     else:
         # Default to static if unknown style
-        filter_complex = f'crop={width}:{height}:0:0:s={width}x{height}:fps={fps}'
+        filter_complex = f'fps={fps},crop={width}:{height}:0:0'
+    
+    # The frame is read and blurred once: zoompan expands a single frame into the
+    # whole clip, the crop-based styles hold it with loop instead
+    if filter_complex.startswith('zoompan'):
+        filter_complex = f'{blur_filters},{filter_complex}'
+    else:
+        filter_complex = f'{blur_filters},loop=-1:1:0,{filter_complex}'
+    
+    if encoder:
+        codec, codec_args, upload = encoder
+        filter_complex += upload
+    else:
+        codec, codec_args = 'libx264', ['-pix_fmt', 'yuv420p', '-preset', preset, '-crf', str(crf), '-threads', str(threads)]
     
     # Run FFmpeg to create the animated background
     subprocess.run([
         ffmpeg_path,
-        '-loop', '1',
-        '-i', str(temp_blurred_img),
+        '-i', str(source_path),
         '-filter_complex', filter_complex,
-        '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+        '-c:v', codec, *codec_args,
         '-t', str(duration),
-        '-preset', 'fast', '-crf', '23',
         str(animated_bg_path), '-y'
     ], check=True)
     
     return animated_bg_path
 
+def measure_input(input_file_path, is_image, ffprobe_path, image_duration, max_video_duration):
+    """Return (segment_duration, width, height, has_audio, audio_copyable) for one input file."""
+    # Determine duration for this segment
+    if is_image:
+        segment_duration = image_duration
+    else:
+        try:
+            duration = get_duration(str(input_file_path), ffprobe_path)
+            segment_duration = min(duration, max_video_duration)
+        except:
+            segment_duration = max_video_duration
+
+    # Calculate resized dimensions for overlay
+    dims = _img_dims(input_file_path) if is_image else None
+    if dims:
+        # Read straight from the PNG/JPEG header
+        w, h = dims
+    elif is_image:
+        # For images, use ffmpeg to get dimensions
+        try:
+            w, h = get_dimensions(str(input_file_path), ffprobe_path)
+        except:
+            # Fallback using PIL if ffprobe fails
+            from PIL import Image
+            img = Image.open(input_file_path)
+            w, h = img.size
+            img.close()
+    else:
+        w, h = get_dimensions(str(input_file_path), ffprobe_path)
+
+    source_has_audio = copy_audio = False
+    if not is_image:
+        # For videos
+        try:
+            source_has_audio = has_audio(str(input_file_path), ffprobe_path)
+            copy_audio = source_has_audio and audio_copyable(str(input_file_path), ffprobe_path)
+        except Exception as e:
+            print(f"Error processing video: {e}")
+            # Fallback to default duration and no audio
+            source_has_audio, segment_duration = False, max_video_duration
+
+    return segment_duration, w, h, source_has_audio, copy_audio
+
+def build_segment(idx, file, is_image, total_files, temp_dir, ffmpeg_path, ffprobe_path, width, height, image_duration,
+                  max_video_duration, blur_radius, encoder, cache_dir=None):
+    """Render one input file into temp_dir/segment_{idx:03d}.mp4.
+
+    Runs in a worker process. Returns the segment's filename, or None if it failed.
+    With a cache_dir, finished segments are kept there and reused by later runs;
+    the full path of the cached segment is returned instead.
+    """
+    print(f"Processing: {file.name} ({idx+1}/{total_files})")
+    input_file_path = file  # resolved when the input directory was scanned
+
+    if cache_dir:
+        key = segment_cache_key(input_file_path, width, height, image_duration, max_video_duration,
+                                blur_radius, encoder, is_image)
+        cached_path = cache_dir / f'segment_{key}.mp4'
+        if cached_path.exists():
+            print(f"Reusing cached segment for {file.name}")
+            return str(cached_path)
+
+    segment_duration, w, h, source_has_audio, copy_audio = measure_input(
+        input_file_path, is_image, ffprobe_path, image_duration, max_video_duration
+    )
+    scale = min(width / w, height / h)
+    scaled_w, scaled_h = int(w * scale), int(h * scale)
+    x, y = (width - scaled_w) // 2, (height - scaled_h) // 2
+
+    codec, codec_args, upload = encoder
+
+    # Create scene - use numbers as filenames without paths
+    temp_mp4 = f'segment_{idx:03d}.mp4'
+    temp_mp4_path = temp_dir / temp_mp4
+
+    # One graph per segment; images are read as a single frame
+    video_graph = SEGMENT_VIDEO_FILTER.format_map({
+        'input': '0:v', 'k': '', 'width': width, 'height': height, 'blur_radius': blur_radius,
+        'sw': scaled_w, 'sh': scaled_h, 'hold': ',loop=-1:1:0' if is_image else '', 'x': x, 'y': y, 'upload': upload
+    })
+
+    # Every segment gets the same AAC stereo 44.1 kHz track, silent where the source
+    # has none, so the segments can be stream-copied together in one concat pass.
+    # Sources that already match are copied as-is; -t cuts them to length.
+    audio_codec = ('-c:a', 'aac', '-b:a', '128k')
+    if copy_audio:
+        audio_args, graph, audio_map = (), video_graph, '0:a:0'
+        audio_codec = ('-c:a', 'copy')
+    elif source_has_audio:
+        audio_args = ()
+        graph = f"{video_graph};{SEGMENT_AUDIO_FILTER.format_map({'input': '0:a', 'k': '', 'duration': segment_duration})}"
+        audio_map = '[a]'
+    else:
+        audio_args = SILENT_AUDIO_INPUT
+        graph, audio_map = video_graph, '1:a'
+
+    # A still image needs only one keyframe per segment, and x264 has a tune for it
+    image_args = ()
+    if is_image:
+        image_args = ('-g', str(max(1, int(IMAGE_FPS * segment_duration))))
+        if codec == 'libx264':
+            image_args += ('-tune', 'stillimage')
+
+    cmd = [
+        ffmpeg_path,
+        '-i', str(input_file_path),
+        *audio_args,
+        '-filter_complex', graph,
+        '-map', '[v]', '-map', audio_map,
+        '-t', str(segment_duration),
+        '-c:v', codec, *codec_args, *image_args,
+        *audio_codec,
+        str(temp_mp4_path), '-y'
+    ]
+            
+    try:
+        # Hardware encodes wait for a free GPU session; libx264 runs unthrottled
+        with _hw_slots if codec != 'libx264' and _hw_slots is not None else nullcontext():
+            subprocess.run(cmd, check=True)
+        if cache_dir:
+            # Moved in only once complete, so a failed run never leaves a bad entry
+            shutil.move(str(temp_mp4_path), str(cached_path))
+            return str(cached_path)
+        return temp_mp4  # Just the filename, not the path
+    except Exception as e:
+        print(f"Error creating segment for {file.name}: {e}")
+        return None
+
+def render_single_process(files, output_file, temp_dir, ffmpeg_path, ffprobe_path, width, height,
+                          image_duration, max_video_duration, blur_radius, encoder):
+    """Render every input with one ffmpeg process: one graph and one encode, no segment files or concat pass.
+
+    Raises subprocess.CalledProcessError if ffmpeg fails.
+    """
+    codec, codec_args, upload = encoder
+    inputs, graphs, silent = [], [], []
+    for k, (file, is_image) in enumerate(files):
+        print(f"Adding: {file.name} ({k+1}/{len(files)})")
+        segment_duration, w, h, source_has_audio, _ = measure_input(
+            file, is_image, ffprobe_path, image_duration, max_video_duration
+        )
+        scale = min(width / w, height / h)
+        scaled_w, scaled_h = int(w * scale), int(h * scale)
+        inputs += ['-i', str(file)]
+        graphs.append(SEGMENT_VIDEO_FILTER.format_map({
+            'input': f'{k}:v', 'k': k, 'width': width, 'height': height, 'blur_radius': blur_radius,
+            'sw': scaled_w, 'sh': scaled_h, 'hold': ',loop=-1:1:0' if is_image else '',
+            'x': (width - scaled_w) // 2, 'y': (height - scaled_h) // 2, 'upload': ''
+        }))
+        # There is no per-segment -t here, so each segment is cut inside the graph
+        graphs.append(f'[v{k}]trim=duration={segment_duration},setpts=PTS-STARTPTS,setsar=1[vt{k}]')
+        if not source_has_audio:
+            silent.append(k)
+        graphs.append(SEGMENT_AUDIO_FILTER.format_map({
+            'input': f'{k}:a' if source_has_audio else f'silence{k}', 'k': k, 'duration': segment_duration
+        }))
+
+    if silent:
+        # One silence source, split between every segment without audio
+        inputs += SILENT_AUDIO_INPUT
+        graphs.append(f'[{len(files)}:a]asplit={len(silent)}' + ''.join(f'[silence{k}]' for k in silent))
+    graphs.append(
+        ''.join(f'[vt{k}][a{k}]' for k in range(len(files))) +
+        f'concat=n={len(files)}:v=1:a=1[vcat][a];[vcat]null{upload}[v]'
+    )
+
+    # The graph grows with every input, so it goes in a script file rather than on the command line
+    script_path = temp_dir / 'filter_complex.txt'
+    script_path.write_text(';\n'.join(graphs))
+    with _hw_slots if codec != 'libx264' and _hw_slots is not None else nullcontext():
+        subprocess.run([
+            ffmpeg_path,
+            *inputs,
+            '-filter_complex_script', str(script_path),
+            '-map', '[v]', '-map', '[a]',
+            '-c:v', codec, *codec_args,
+            '-c:a', 'aac', '-b:a', '128k',
+            '-movflags', '+faststart',
+            str(output_file), '-y'
+        ], check=True)
+
 def main():
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description='Assemble a carousel video from images and videos.')
@@ -254,6 +581,16 @@ def main():
     parser.add_argument('--ffmpeg-path', help='Custom path to ffmpeg executable')
     parser.add_argument('--bg-animation', choices=['zoom_in', 'zoom_out', 'pan_right', 'pan_left', 'random', 'none'], 
                         default='zoom_in', help='Background animation style (default: zoom_in)')
+    parser.add_argument('--preset', default='fast',
+                        help='libx264 preset, e.g. ultrafast for draft renders (default: fast)')
+    parser.add_argument('--crf', type=float, default=23, help='libx264 constant rate factor (default: 23)')
+    parser.add_argument('--x264-threads', type=int,
+                        help='Threads per libx264 encode; 0 lets FFmpeg decide (default: cores split across parallel segments)')
+    parser.add_argument('--hwaccel', choices=['auto', 'none', *HW_ENCODERS], default='none',
+                        help='Hardware H.264 encoder; auto picks the first one FFmpeg supports (default: none)')
+    parser.add_argument('--cache-dir', help='Keep rendered segments here and reuse them on later runs')
+    parser.add_argument('--single-process', action='store_true',
+                        help='Render all inputs in one ffmpeg process instead of parallel segments; ignores --cache-dir')
     args = parser.parse_args()
 
     # Set up variables
@@ -268,6 +605,11 @@ def main():
     # Get ffmpeg path
     ffmpeg_path = args.ffmpeg_path if args.ffmpeg_path else get_ffmpeg_path()
     print(f"Using FFmpeg from: {ffmpeg_path}")
+    ffprobe_path = str(Path(ffmpeg_path).with_name('ffprobe' + Path(ffmpeg_path).suffix))
+
+    cache_dir = Path(args.cache_dir).resolve() if args.cache_dir else None
+    if cache_dir:
+        cache_dir.mkdir(parents=True, exist_ok=True)
 
     # Ensure output directory exists
     try:
@@ -279,10 +621,10 @@ def main():
     # Check if output file is locked or in use
     if output_file.exists():
         try:
-            # Try to rename the file - this will fail if it's locked
-            temp_name = output_file.with_name(f"{output_file.stem}_temp{output_file.suffix}")
-            output_file.rename(temp_name)
-            temp_name.rename(output_file)
+            # Opening for append fails if another process holds the file, and
+            # unlike a rename round-trip never leaves it under a different name
+            with open(output_file, 'ab'):
+                pass
             print("Output file is not locked, proceeding.")
         except PermissionError:
             print("Output file appears to be in use. Using a different filename.")
@@ -298,163 +640,59 @@ def main():
 
     # Create a temporary working directory
     temp_dir = Path('temp_carousel_files').resolve()
+    # Clear leftovers from a previous run in one call
+    shutil.rmtree(temp_dir, ignore_errors=True)
     if temp_dir.exists():
-        # Clean existing files in temp directory
-        for old_file in temp_dir.glob('*'):
-            try:
-                old_file.unlink()
-            except:
-                print(f"Warning: Could not delete old temp file {old_file}")
-    else:
-        temp_dir.mkdir()
+        print(f"Warning: Could not delete all old temp files in {temp_dir}")
+    temp_dir.mkdir(parents=True, exist_ok=True)
 
-    # Scan and sort files
-    files = sorted(f for f in input_dir.iterdir() if f.suffix.lower() in supported_exts)
+    # Scan, classify and sort files in one pass; scandir entries already know
+    # whether they are files, and input_dir is resolved so paths are absolute
+    files = []
+    with os.scandir(input_dir) as it:
+        for entry in it:
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in supported_exts and entry.is_file():
+                files.append((Path(entry.path), ext in image_exts))
+    files.sort()
     if not files:
         print("No supported files found in the input directory.")
         return
 
-    temp_files = []
-    
-    # Use dedicated paths in temp directory
-    temp_frame_path = temp_dir / 'temp_frame.jpg'
-
-    # Process each file
-    for idx, file in enumerate(files):
-        print(f"Processing: {file.name} ({idx+1}/{len(files)})")
-        is_image = file.suffix.lower() in image_exts
-        
-        input_file_path = file.resolve()
-
-        # Extract first frame
-        if is_image:
-            shutil.copy(str(input_file_path), str(temp_frame_path))
-        else:
-            subprocess.run([ffmpeg_path, '-i', str(input_file_path), '-vframes', '1', str(temp_frame_path), 
-                           '-y'], check=True)
-
-        # Determine duration for this segment
-        if is_image:
-            segment_duration = image_duration
-        else:
-            try:
-                duration = get_duration(str(input_file_path), ffmpeg_path)
-                segment_duration = min(duration, max_video_duration)
-            except:
-                segment_duration = max_video_duration
-                
-
-        # Generate static blurred background (original behavior)
-        bg_path = temp_dir / 'temp_bg.jpg'
-        subprocess.run([
-            ffmpeg_path, '-i', str(temp_frame_path),
-            '-vf', f'scale={width}:{height}:force_original_aspect_ratio=increase,'
-                    f'crop={width}:{height},gblur=sigma={blur_radius}',
-            str(bg_path), '-y'
-        ], check=True)
-
-        # Calculate resized dimensions for overlay
-        if is_image:
-            # For images, use ffmpeg to get dimensions
-            try:
-                w, h = get_dimensions(str(input_file_path), ffmpeg_path)
-            except:
-                # Fallback using PIL if ffprobe fails
-                from PIL import Image
-                img = Image.open(input_file_path)
-                w, h = img.size
-                img.close()
-        else:
-            w, h = get_dimensions(str(input_file_path), ffmpeg_path)
-            
-        scale = min(width / w, height / h)
-        scaled_w, scaled_h = int(w * scale), int(h * scale)
-        x, y = (width - scaled_w) // 2, (height - scaled_h) // 2
+    # Segments are independent, so encode several at once. Each worker's ffmpeg
+    # gets a share of the cores instead of all of them.
+    workers = 1 if args.single_process else max(1, (os.cpu_count() or 2) // 2)
+    hw_encoder = detect_hw_encoder(ffmpeg_path) if args.hwaccel == 'auto' else args.hwaccel
+    if hw_encoder in HW_ENCODERS:
+        print(f"Encoding with {HW_ENCODERS[hw_encoder][0]}")
+        encoder = HW_ENCODERS[hw_encoder]
+    else:
+        x264_threads = args.x264_threads if args.x264_threads is not None else max(1, (os.cpu_count() or 1) // workers)
+        encoder = ('libx264', ['-preset', args.preset, '-crf', str(args.crf), '-threads', str(x264_threads)], '')
+    worker = partial(
+        build_segment, total_files=len(files), temp_dir=temp_dir, ffmpeg_path=ffmpeg_path, ffprobe_path=ffprobe_path,
+        width=width, height=height, image_duration=image_duration, max_video_duration=max_video_duration,
+        blur_radius=blur_radius, encoder=encoder, cache_dir=cache_dir
+    )
+    # Probe every video concurrently before encoding starts; workers receive the
+    # results once, through the pool initializer, instead of each running ffprobe.
+    # Images are measured from their headers.
+    probes = asyncio.run(probe_all([str(f) for f, is_image in files if not is_image], ffprobe_path))
 
-        # Create scene - use numbers as filenames without paths
-        temp_mp4 = f'segment_{idx:03d}.mp4'
-        temp_mp4_path = temp_dir / temp_mp4
-        
-        if is_image:
-            cmd = [
-                ffmpeg_path,
-                '-loop', '1', '-i', str(bg_path),
-                '-loop', '1', '-i', str(input_file_path),
-                '-filter_complex', 
-                f'[1:v]scale={scaled_w}:{scaled_h}[overlay];'
-                f'[0:v][overlay]overlay={x}:{y}[v]',
-                '-map', '[v]',
-                '-t', str(segment_duration),
-                '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-                '-an',  # No audio for images
-                str(temp_mp4_path), '-y'
-            ]
-        else:
-            # For videos
-            try:
-                # Check if the video has audio
-                ffprobe_path = ffmpeg_path.replace("ffmpeg.exe", "ffprobe.exe") if ffmpeg_path.endswith("ffmpeg.exe") else ffmpeg_path.replace("ffmpeg", "ffprobe")
-                audio_check_cmd = [
-                    ffprobe_path, '-i', str(input_file_path), 
-                    '-show_streams', '-select_streams', 'a', '-loglevel', 'error'
-                ]
-                audio_result = subprocess.run(audio_check_cmd, stdout=subprocess.PIPE, text=True)
-                has_audio = bool(audio_result.stdout.strip())
-                
-                # Original static background method
-                if has_audio:
-                    cmd = [
-                        ffmpeg_path,
-                        '-loop', '1', '-t', str(segment_duration), '-i', str(bg_path),
-                        '-i', str(input_file_path),
-                        '-filter_complex',
-                        f'[1:v]scale={scaled_w}:{scaled_h}[overlay];'
-                        f'[0:v][overlay]overlay={x}:{y}[v];'
-                        f'[1:a]atrim=0:{segment_duration},asetpts=PTS-STARTPTS[a]',
-                        '-map', '[v]', '-map', '[a]',
-                        '-t', str(segment_duration),
-                        '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-                        '-c:a', 'aac', '-b:a', '128k',
-                        str(temp_mp4_path), '-y'
-                    ]
-                else:
-                        # Video without audio
-                        cmd = [
-                            ffmpeg_path,
-                            '-loop', '1', '-t', str(segment_duration), '-i', str(bg_path),
-                            '-i', str(input_file_path),
-                            '-filter_complex',
-                            f'[1:v]scale={scaled_w}:{scaled_h}[overlay];'
-                            f'[0:v][overlay]overlay={x}:{y}[v]',
-                            '-map', '[v]',
-                            '-t', str(segment_duration),
-                            '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-                            '-an',
-                            str(temp_mp4_path), '-y'
-                        ]
-            except Exception as e:
-                print(f"Error processing video: {e}")
-                # Fallback to default duration and no audio
-                cmd = [
-                    ffmpeg_path,
-                    '-loop', '1', '-t', str(max_video_duration), '-i', str(bg_path),
-                    '-i', str(input_file_path),
-                    '-filter_complex',
-                    f'[1:v]scale={scaled_w}:{scaled_h}[overlay];'
-                    f'[0:v][overlay]overlay={x}:{y}[v]',
-                    '-map', '[v]',
-                    '-t', str(max_video_duration),
-                    '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-                    '-an',
-                    str(temp_mp4_path), '-y'
-                ]
-                
+    if args.single_process:
+        # One ffmpeg startup and one encoder session for the whole carousel
+        _init_worker(multiprocessing.Semaphore(MAX_HW_SESSIONS), probes)
         try:
-            subprocess.run(cmd, check=True)
-            temp_files.append(temp_mp4)  # Store just the filename, not the path
+            render_single_process(files, output_file, temp_dir, ffmpeg_path, ffprobe_path, width, height,
+                                  image_duration, max_video_duration, blur_radius, encoder)
         except Exception as e:
-            print(f"Error creating segment for {file.name}: {e}")
-            continue
+            print(f"Error rendering in a single process: {e}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(multiprocessing.Semaphore(MAX_HW_SESSIONS), probes)) as executor:
+        temp_files = [temp_mp4 for temp_mp4 in executor.map(worker, range(len(files)), *zip(*files)) if temp_mp4]
 
     if not temp_files:
         print("No segments were successfully created. Cannot create output video.")
@@ -462,23 +700,14 @@ def main():
 
     # Use improved batch concatenation method
     try:
-        concat_segments_in_batches(temp_files, temp_dir, ffmpeg_path, output_file, batch_size=10)
+        concat_segments_in_batches(temp_files, temp_dir, ffmpeg_path, output_file)
     except Exception as e:
         print(f"Error during final concatenation: {e}")
     
     # Clean up temp directory
-    try:
-        for temp_file in temp_dir.glob('*'):
-            try:
-                temp_file.unlink()
-            except:
-                print(f"Warning: Could not delete {temp_file}")
-        try:
-            temp_dir.rmdir()
-        except:
-            print(f"Warning: Could not remove temp directory. It may not be empty.")
-    except Exception as e:
-        print(f"Warning: Could not completely clean up temp directory: {e}")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    if temp_dir.exists():
+        print(f"Warning: Could not completely clean up temp directory {temp_dir}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file